@@ -1,198 +1,272 @@
-import streamlit as st
-import pandas as pd
-import requests
-import base64
-
-# ========================
-# CONFIG
-# ========================
-BASE_URL = "http://127.0.0.1:8000"
-
-st.set_page_config(
-    page_title="Smart Data Analysis - Streamlit",
-    layout="wide"
-)
-
-# ========================
-# STATE VARIABLES
-# ========================
-if "session_id" not in st.session_state:
-    st.session_state.session_id = None
-
-if "sheets" not in st.session_state:
-    st.session_state.sheets = []
-
-if "file_name" not in st.session_state:
-    st.session_state.file_name = None
-
-if "domain" not in st.session_state:
-    st.session_state.domain = None
-
-# Title
-st.title("Smart Data Analysis (Streamlit Version)")
-
-st.markdown("""
-Upload an Excel file → preview individual sheets → see statistical summary →  
-Generate **manual** and **AI-generated** visualizations.
-""")
-
-# 1. FILE UPLOAD
-st.header("1. Upload Excel File")
-
-uploaded_file = st.file_uploader("Upload your Excel file", type=["xlsx", "xls"])
-
-if uploaded_file is not None:
-    if st.button("Upload & Process File"):
-        with st.spinner("Uploading..."):
-            files = {"file": uploaded_file}
-
-            resp = requests.post(f"{BASE_URL}/upload/excel", files=files)
-
-            if resp.status_code != 200:
-                st.error(f"Upload failed: {resp.text}")
-            else:
-                data = resp.json()
-                st.session_state.session_id = data["session_id"]
-                st.session_state.sheets = data["sheets"]
-                st.session_state.file_name = data["file_name"]
-                st.session_state.domain = data["domain"]
-
-                st.success("File uploaded successfully!")
-
-# 2. SHEET PREVIEW + STATS
-st.header("2. Preview & Statistical Summary")
-
-if st.session_state.session_id and st.session_state.sheets:
-
-    sheet_names = [s["sheet_name"] for s in st.session_state.sheets]
-    selected_sheet = st.selectbox("Select a sheet", sheet_names)
-
-    if st.button("Load Preview & Stats"):
-        with st.spinner(f"Loading preview & stats for {selected_sheet}..."):
-
-            # ---- Preview ----
-            preview_req = {
-                "session_id": st.session_state.session_id,
-                "sheet_name": selected_sheet,
-                "n_rows": 20
-            }
-            prev_res = requests.post(f"{BASE_URL}/data/preview", json=preview_req).json()
-
-            if "rows" in prev_res:
-                st.subheader("Preview (first 20 rows)")
-                df_prev = pd.DataFrame(prev_res["rows"])
-                st.dataframe(df_prev, use_container_width=True)
-
-            # ---- Stats ----
-            stats_req = {
-                "session_id": st.session_state.session_id,
-                "sheet_name": selected_sheet
-            }
-            stats_res = requests.post(f"{BASE_URL}/data/stats", json=stats_req).json()
-
-            st.subheader("Statistical Summary")
-
-            if "summary" in stats_res:
-                stat_rows = []
-                for col, details in stats_res["summary"].items():
-                    stat_rows.append({
-                        "Column": col,
-                        "Type": details["type"],
-                        "Details": str(details)
-                    })
-                st.table(pd.DataFrame(stat_rows))
-
-            if "missing_values" in stats_res:
-                mv = stats_res["missing_values"]
-                mv_rows = []
-                for col, cnt in mv["count"].items():
-                    mv_rows.append({
-                        "Column": col,
-                        "Missing Count": cnt,
-                        "Missing %": f"{mv['percent'][col]}%"
-                    })
-                st.subheader("Missing Values")
-                st.table(pd.DataFrame(mv_rows))
-
-# Create isolated containers for each visualization section
-manual_container = st.container()
-ai_container = st.container()
-
-# 3. MANUAL VISUALIZATIONS (ALL SHEETS)
-with manual_container:
-    st.header("3. Generate Manual Visualizations (All Sheets)")
-
-    if st.session_state.session_id:
-        if st.button("Generate Manual Visualizations", key="btn_manual"):
-            with st.spinner("Generating visualizations for ALL sheets..."):
-                req = {
-                    "session_id": st.session_state.session_id,
-                    "sheet_name": ""
-                }
-
-                resp = requests.post(f"{BASE_URL}/data/visualizations/all", json=req)
-
-                if resp.status_code != 200:
-                    st.error(f"Error: {resp.text}")
-                else:
-                    st.session_state["manual_viz"] = resp.json()
-                    st.success("Manual visualizations generated!")
-
-    # Render MANUAL visualizations
-    if "manual_viz" in st.session_state:
-        data = st.session_state["manual_viz"]
-
-        for sheet, visualizations in data.items():
-            st.subheader(f"Sheet: {sheet}")
-
-            cols = st.columns(3)
-            for i, viz in enumerate(visualizations):
-                with cols[i % 3]:
-                    st.markdown(f"**{viz['chart_type']}**")
-                    st.caption(f"X: {viz['x']} | Y: {viz.get('y','—')}")
-                    st.write(viz["description"])
-
-                    if viz["image_base64"]:
-                        img_bytes = base64.b64decode(viz["image_base64"])
-                        st.image(img_bytes, width=300)
-
-
-
-# 4. AI-GENERATED VISUALIZATIONS
-with ai_container:
-    st.header("4. AI-Generated Visualization Suggestions")
-    st.markdown("These visualizations come from the **/visualizations/ai** endpoint using Groq LLM.")
-
-    if st.session_state.session_id:
-        if st.button("Generate AI Visualizations", key="btn_ai"):
-            with st.spinner("Generating AI visualizations for ALL sheets..."):
-                req = {
-                    "session_id": st.session_state.session_id,
-                    "sheet_name": ""
-                }
-
-                resp = requests.post(f"{BASE_URL}/data/visualizations/ai", json=req)
-
-                if resp.status_code != 200:
-                    st.error(f"Error: {resp.text}")
-                else:
-                    st.session_state["ai_viz"] = resp.json()
-                    st.success("AI visualizations generated!")
-
-    # Render AI visualizations
-    if "ai_viz" in st.session_state:
-        data = st.session_state["ai_viz"]
-
-        for sheet, visualizations in data.items():
-            st.subheader(f"AI Sheet: {sheet}")
-
-            cols = st.columns(3)
-            for i, viz in enumerate(visualizations):
-                with cols[i % 3]:
-                    st.markdown(f"**{viz['chart_type']}**")
-                    st.caption(f"X: {viz['x']} | Y: {viz.get('y','—')}")
-                    st.write(viz["description"])
-
-                    if viz["image_base64"]:
-                        img_bytes = base64.b64decode(viz["image_base64"])
-                        st.image(img_bytes, width=300)
+import asyncio
+import streamlit as st
+import pandas as pd
+import base64
+
+import httpx
+
+# ========================
+# CONFIG
+# ========================
+BASE_URL = "http://127.0.0.1:8000"
+
+st.set_page_config(
+    page_title="Smart Data Analysis - Streamlit",
+    layout="wide"
+)
+
+# ========================
+# ASYNC BACKEND CALLS
+# ========================
+async def fetch_preview_and_stats(session_id: str, sheet_name: str):
+    """
+    Fire /data/preview and /data/stats concurrently so the button
+    waits for max(preview, stats) instead of their sum.
+    """
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=120) as client:
+        preview_req = {
+            "session_id": session_id,
+            "sheet_name": sheet_name,
+            "n_rows": 20
+        }
+        stats_req = {
+            "session_id": session_id,
+            "sheet_name": sheet_name
+        }
+        prev_resp, stats_resp = await asyncio.gather(
+            client.post("/data/preview", json=preview_req),
+            client.post("/data/stats", json=stats_req),
+        )
+    prev_resp.raise_for_status()
+    stats_resp.raise_for_status()
+    return prev_resp.json(), stats_resp.json()
+
+
+async def fetch_visualizations(session_id: str, endpoints):
+    """
+    POST the given /data/visualizations/* endpoints concurrently.
+    Returns one response per endpoint, in order.
+    """
+    req = {
+        "session_id": session_id,
+        "sheet_name": ""
+    }
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=600) as client:
+        responses = await asyncio.gather(
+            *[client.post(ep, json=req) for ep in endpoints]
+        )
+    return responses
+
+# ========================
+# CACHED FETCH WRAPPERS
+# ========================
+# st.cache_data memoizes by argument hash, so re-clicking a button or
+# re-running the script skips the backend round trip entirely. Failed
+# calls raise and are NOT cached.
+
+@st.cache_data(ttl=600, show_spinner=False)
+def load_preview_and_stats(session_id: str, sheet_name: str):
+    return asyncio.run(fetch_preview_and_stats(session_id, sheet_name))
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def load_visualizations(session_id: str, endpoint: str):
+    (resp,) = asyncio.run(fetch_visualizations(session_id, [endpoint]))
+    resp.raise_for_status()
+    return resp.json()
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def load_all_visualizations(session_id: str):
+    manual_resp, ai_resp = asyncio.run(
+        fetch_visualizations(
+            session_id,
+            ["/data/visualizations/all", "/data/visualizations/ai"],
+        )
+    )
+    manual_resp.raise_for_status()
+    ai_resp.raise_for_status()
+    return manual_resp.json(), ai_resp.json()
+
+# ========================
+# STATE VARIABLES
+# ========================
+if "session_id" not in st.session_state:
+    st.session_state.session_id = None
+
+if "sheets" not in st.session_state:
+    st.session_state.sheets = []
+
+if "file_name" not in st.session_state:
+    st.session_state.file_name = None
+
+if "domain" not in st.session_state:
+    st.session_state.domain = None
+
+# Title
+st.title("Smart Data Analysis (Streamlit Version)")
+
+st.markdown("""
+Upload an Excel file → preview individual sheets → see statistical summary →
+Generate **manual** and **AI-generated** visualizations.
+""")
+
+# 1. FILE UPLOAD
+st.header("1. Upload Excel File")
+
+uploaded_file = st.file_uploader("Upload your Excel file", type=["xlsx", "xls"])
+
+if uploaded_file is not None:
+    if st.button("Upload & Process File"):
+        with st.spinner("Uploading..."):
+            files = {"file": uploaded_file}
+
+            resp = httpx.post(f"{BASE_URL}/upload/excel", files=files, timeout=300)
+
+            if resp.status_code != 200:
+                st.error(f"Upload failed: {resp.text}")
+            else:
+                data = resp.json()
+                st.session_state.session_id = data["session_id"]
+                st.session_state.sheets = data["sheets"]
+                st.session_state.file_name = data["file_name"]
+                st.session_state.domain = data["domain"]
+
+                st.success("File uploaded successfully!")
+
+# 2. SHEET PREVIEW + STATS
+st.header("2. Preview & Statistical Summary")
+
+if st.session_state.session_id and st.session_state.sheets:
+
+    sheet_names = [s["sheet_name"] for s in st.session_state.sheets]
+    selected_sheet = st.selectbox("Select a sheet", sheet_names)
+
+    if st.button("Load Preview & Stats"):
+        with st.spinner(f"Loading preview & stats for {selected_sheet}..."):
+
+            prev_res, stats_res = load_preview_and_stats(
+                st.session_state.session_id, selected_sheet
+            )
+
+            # ---- Preview ----
+            if "rows" in prev_res:
+                st.subheader("Preview (first 20 rows)")
+                df_prev = pd.DataFrame(prev_res["rows"])
+                st.dataframe(df_prev, use_container_width=True)
+
+            # ---- Stats ----
+            st.subheader("Statistical Summary")
+
+            if "summary" in stats_res:
+                stat_rows = []
+                for col, details in stats_res["summary"].items():
+                    stat_rows.append({
+                        "Column": col,
+                        "Type": details["type"],
+                        "Details": str(details)
+                    })
+                st.table(pd.DataFrame(stat_rows))
+
+            if "missing_values" in stats_res:
+                mv = stats_res["missing_values"]
+                mv_rows = []
+                for col, cnt in mv["count"].items():
+                    mv_rows.append({
+                        "Column": col,
+                        "Missing Count": cnt,
+                        "Missing %": f"{mv['percent'][col]}%"
+                    })
+                st.subheader("Missing Values")
+                st.table(pd.DataFrame(mv_rows))
+
+# Create isolated containers for each visualization section
+manual_container = st.container()
+ai_container = st.container()
+
+# 3. MANUAL VISUALIZATIONS (ALL SHEETS)
+with manual_container:
+    st.header("3. Generate Manual Visualizations (All Sheets)")
+
+    if st.session_state.session_id:
+        if st.button("Generate Manual Visualizations", key="btn_manual"):
+            with st.spinner("Generating visualizations for ALL sheets..."):
+                try:
+                    st.session_state["manual_viz"] = load_visualizations(
+                        st.session_state.session_id, "/data/visualizations/all"
+                    )
+                    st.success("Manual visualizations generated!")
+                except httpx.HTTPStatusError as e:
+                    st.error(f"Error: {e.response.text}")
+
+        if st.button("Generate Manual + AI Together", key="btn_both"):
+            with st.spinner("Generating manual + AI visualizations concurrently..."):
+                try:
+                    manual_viz, ai_viz = load_all_visualizations(
+                        st.session_state.session_id
+                    )
+                    st.session_state["manual_viz"] = manual_viz
+                    st.session_state["ai_viz"] = ai_viz
+                    st.success("Visualizations generated!")
+                except httpx.HTTPStatusError as e:
+                    st.error(f"Error: {e.response.text}")
+
+    # Render MANUAL visualizations
+    if "manual_viz" in st.session_state:
+        data = st.session_state["manual_viz"]
+
+        for sheet, visualizations in data.items():
+            st.subheader(f"Sheet: {sheet}")
+
+            cols = st.columns(3)
+            for i, viz in enumerate(visualizations):
+                with cols[i % 3]:
+                    st.markdown(f"**{viz['chart_type']}**")
+                    st.caption(f"X: {viz['x']} | Y: {viz.get('y','—')}")
+                    st.write(viz["description"])
+
+                    # Charts are served as raw bytes from the binary
+                    # endpoint; base64 kept as fallback for old payloads
+                    if viz.get("image_id"):
+                        st.image(f"{BASE_URL}/data/chart/{viz['image_id']}", width=300)
+                    elif viz.get("image_base64"):
+                        img_bytes = base64.b64decode(viz["image_base64"])
+                        st.image(img_bytes, width=300)
+
+
+
+# 4. AI-GENERATED VISUALIZATIONS
+with ai_container:
+    st.header("4. AI-Generated Visualization Suggestions")
+    st.markdown("These visualizations come from the **/visualizations/ai** endpoint using Groq LLM.")
+
+    if st.session_state.session_id:
+        if st.button("Generate AI Visualizations", key="btn_ai"):
+            with st.spinner("Generating AI visualizations for ALL sheets..."):
+                try:
+                    st.session_state["ai_viz"] = load_visualizations(
+                        st.session_state.session_id, "/data/visualizations/ai"
+                    )
+                    st.success("AI visualizations generated!")
+                except httpx.HTTPStatusError as e:
+                    st.error(f"Error: {e.response.text}")
+
+    # Render AI visualizations
+    if "ai_viz" in st.session_state:
+        data = st.session_state["ai_viz"]
+
+        for sheet, visualizations in data.items():
+            st.subheader(f"AI Sheet: {sheet}")
+
+            cols = st.columns(3)
+            for i, viz in enumerate(visualizations):
+                with cols[i % 3]:
+                    st.markdown(f"**{viz['chart_type']}**")
+                    st.caption(f"X: {viz['x']} | Y: {viz.get('y','—')}")
+                    st.write(viz["description"])
+
+                    if viz.get("image_id"):
+                        st.image(f"{BASE_URL}/data/chart/{viz['image_id']}", width=300)
+                    elif viz.get("image_base64"):
+                        img_bytes = base64.b64decode(viz["image_base64"])
+                        st.image(img_bytes, width=300)
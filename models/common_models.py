@@ -1,4 +1,6 @@
 from typing import List, Dict, Optional
+
+import msgspec
 from pydantic import BaseModel
 
 class SheetInfo(BaseModel):
@@ -15,13 +17,18 @@ class StatsRequest(BaseModel):
     session_id: str
     sheet_name: str
 
-class VizConfig(BaseModel):
+class VizConfig(msgspec.Struct):
+    # msgspec.Struct, not pydantic: visualization responses carry hundreds
+    # of these and msgspec.json.encode serializes them directly without
+    # building intermediate dicts
     chart_type: str           # e.g. "bar", "line", "histogram", "box"
+    description: str = ""
     x: Optional[str] = None
     y: Optional[str] = None
     hue: Optional[str] = None
-    description: str
     image_base64: Optional[str] = None
+    image_id: Optional[str] = None   # id for GET /data/chart/{image_id}
+    chart_format: str = "png"   # image encoding: "png" or "jpeg"
 
 class VizRequest(BaseModel):
     session_id: str
@@ -1,67 +1,89 @@
-from fastapi import APIRouter, HTTPException
-from models.common_models import PreviewRequest, StatsRequest, VizRequest
-from services.session_service import get_session
-from services.preview_service import get_preview_rows
-from services.stats_service import get_statistical_summary
-from services.viz_service import suggest_visualizations
-
-router = APIRouter(prefix="/data", tags=["data"])
-
-@router.post("/preview")
-async def preview_data(req: PreviewRequest):
-    session = get_session(req.session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found.")
-
-    preview = get_preview_rows(req.session_id, req.sheet_name, req.n_rows)
-    return preview
-
-@router.post("/stats")
-async def stats_data(req: StatsRequest):
-    session = get_session(req.session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found.")
-
-    stats = get_statistical_summary(req.session_id, req.sheet_name)
-    return stats
-
-@router.post("/visualizations")
-async def visualizations(req: VizRequest):
-    session = get_session(req.session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found.")
-
-    viz_configs = suggest_visualizations(req.session_id, req.sheet_name)
-    return [v.dict() for v in viz_configs]
-
-@router.post("/visualizations/all")
-async def visualizations_all(req: VizRequest):
-    session = get_session(req.session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found.")
-
-    from services.manual_viz_service import suggest_visualizations_for_all_sheets
-
-    result = suggest_visualizations_for_all_sheets(req.session_id)
-
-    # Convert Pydantic objects to dict
-    return {
-        sheet: [v.dict() for v in viz_list]
-        for sheet, viz_list in result.items()
-    }
-
-@router.post("/visualizations/ai")
-async def visualizations_ai(req: VizRequest):
-    session = get_session(req.session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found.")
-
-    from services.viz_service import suggest_visualizations_for_all_sheets
-
-    result = suggest_visualizations_for_all_sheets(req.session_id)
-
-    # Convert Pydantic objects to dict
-    return {
-        sheet: [v.dict() for v in viz_list]
-        for sheet, viz_list in result.items()
-    }
\ No newline at end of file
+import asyncio
+
+import msgspec
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from models.common_models import PreviewRequest, StatsRequest, VizRequest
+from services.session_service import get_db, get_session
+from services.viz_cache import get_chart_image
+from services.preview_service import get_preview_rows
+from services.stats_service import get_statistical_summary
+from services.viz_service import suggest_visualizations
+
+router = APIRouter(prefix="/data", tags=["data"])
+
+@router.post("/preview")
+async def preview_data(req: PreviewRequest, db: Session = Depends(get_db)):
+    # get_session/get_preview_rows are synchronous (SQLAlchemy + pandas),
+    # so run them in the threadpool instead of blocking the event loop.
+    session = await asyncio.to_thread(get_session, db, req.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found.")
+
+    preview = await asyncio.to_thread(get_preview_rows, req.session_id, req.sheet_name, req.n_rows)
+    return preview
+
+@router.post("/stats")
+async def stats_data(req: StatsRequest, db: Session = Depends(get_db)):
+    session = await asyncio.to_thread(get_session, db, req.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found.")
+
+    stats = await asyncio.to_thread(get_statistical_summary, req.session_id, req.sheet_name)
+    return stats
+
+@router.post("/visualizations")
+async def visualizations(req: VizRequest, db: Session = Depends(get_db)):
+    session = await asyncio.to_thread(get_session, db, req.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found.")
+
+    viz_configs = await asyncio.to_thread(suggest_visualizations, req.session_id, req.sheet_name)
+    # msgspec encodes the Struct list directly — no per-object dict, no
+    # jsonable_encoder pass over megabyte base64 strings
+    return Response(content=msgspec.json.encode(viz_configs), media_type="application/json")
+
+@router.post("/visualizations/all")
+async def visualizations_all(req: VizRequest, db: Session = Depends(get_db)):
+    session = await asyncio.to_thread(get_session, db, req.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found.")
+
+    from services.manual_viz_service import suggest_visualizations_for_all_sheets
+
+    # The service fans out chart rendering to its own process pool;
+    # the threadpool hop just keeps the event loop free while it runs.
+    # Keying the cache by file hash lets re-uploads of the same file
+    # reuse already-rendered charts.
+    cache_key = (session.meta or {}).get("file_hash")
+    result = await asyncio.to_thread(
+        suggest_visualizations_for_all_sheets, req.session_id, None, cache_key
+    )
+
+    return Response(content=msgspec.json.encode(result), media_type="application/json")
+
+@router.get("/chart/{chart_id}")
+async def chart_image(chart_id: str):
+    stored = get_chart_image(chart_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Chart not found.")
+
+    image, fmt = stored
+    return Response(content=image, media_type=f"image/{fmt}")
+
+@router.post("/visualizations/ai")
+async def visualizations_ai(req: VizRequest, db: Session = Depends(get_db)):
+    session = await asyncio.to_thread(get_session, db, req.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found.")
+
+    from services.viz_service import suggest_visualizations_for_all_sheets
+
+    cache_key = (session.meta or {}).get("file_hash")
+    result = await asyncio.to_thread(
+        suggest_visualizations_for_all_sheets, req.session_id, None, cache_key
+    )
+
+    return Response(content=msgspec.json.encode(result), media_type="application/json")
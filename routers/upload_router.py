@@ -1,38 +1,48 @@
-import uuid
-from fastapi import APIRouter, UploadFile, File, HTTPException
-
-from services.file_upload_service import save_uploaded_file
-from services.excel_reader_service import load_excel_for_session
-from services.domain_logic_service import resolve_domain
-from services.session_service import create_session
-
-router = APIRouter(prefix="/upload", tags=["upload"])
-
-@router.post("/excel")
-async def upload_excel(file: UploadFile = File(...)):
-    # Save or reuse file
-    file_path = save_uploaded_file(file)
-
-    session_id = uuid.uuid4().hex
-
-    sheet_infos = load_excel_for_session(session_id, file_path)
-    if not sheet_infos:
-        raise HTTPException(status_code=400, detail="Uploaded Excel has no sheets.")
-
-    primary_sheet = sheet_infos[0].sheet_name
-    domain = resolve_domain(session_id, primary_sheet)
-
-    # Create a NEW session every time (even if file reused)
-    create_session(
-        session_id=session_id,
-        file_path=file_path,
-        file_name=file.filename,
-        domain=domain,
-    )
-
-    return {
-        "session_id": session_id,
-        "file_name": file.filename,
-        "domain": domain,
-        "sheets": [s.dict() for s in sheet_infos],
-    }
+import asyncio
+import uuid
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from sqlalchemy.orm import Session
+
+from services.file_upload_service import compute_file_hash, save_uploaded_file
+from services.excel_reader_service import load_excel_for_session
+from services.domain_logic_service import resolve_domain
+from services.session_service import create_session, get_db
+
+router = APIRouter(prefix="/upload", tags=["upload"])
+
+@router.post("/excel")
+async def upload_excel(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    # Save or reuse file (disk IO → threadpool so the event loop stays free)
+    file_path = await asyncio.to_thread(save_uploaded_file, file, db)
+
+    session_id = uuid.uuid4().hex
+
+    # Excel parsing is CPU-heavy; run it off the loop as well
+    sheet_infos = await asyncio.to_thread(load_excel_for_session, session_id, file_path)
+    if not sheet_infos:
+        raise HTTPException(status_code=400, detail="Uploaded Excel has no sheets.")
+
+    primary_sheet = sheet_infos[0].sheet_name
+    domain = resolve_domain(session_id, primary_sheet)
+
+    # Stable content hash: lets viz caches survive re-uploads of the
+    # same file under a new session_id
+    file_hash = await asyncio.to_thread(compute_file_hash, file_path)
+
+    # Create a NEW session every time (even if file reused)
+    await asyncio.to_thread(
+        create_session,
+        db,
+        session_id=session_id,
+        file_path=file_path,
+        file_name=file.filename,
+        domain=domain,
+        meta={"file_hash": file_hash},
+    )
+
+    return {
+        "session_id": session_id,
+        "file_name": file.filename,
+        "domain": domain,
+        "sheets": [s.dict() for s in sheet_infos],
+    }
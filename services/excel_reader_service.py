@@ -1,37 +1,88 @@
-from typing import Dict, List
-import pandas as pd
-from models.common_models import SheetInfo
-
-# In-memory cache of loaded Excel files per session
-_EXCEL_CACHE: Dict[str, Dict[str, pd.DataFrame]] = {}
-
-def load_excel_for_session(session_id: str, file_path: str) -> List[SheetInfo]:
-    """
-    Read Excel file and store per-session sheet dataframes in cache.
-    Returns metadata for all sheets.
-    """
-    xls = pd.ExcelFile(file_path)
-    sheet_infos: List[SheetInfo] = []
-    sheet_dfs: Dict[str, pd.DataFrame] = {}
-
-    for sheet_name in xls.sheet_names:
-        df = xls.parse(sheet_name)
-        sheet_dfs[sheet_name] = df
-        sheet_infos.append(
-            SheetInfo(
-                sheet_name=sheet_name,
-                n_rows=int(df.shape[0]),
-                n_cols=int(df.shape[1])
-            )
-        )
-
-    _EXCEL_CACHE[session_id] = sheet_dfs
-    return sheet_infos
-
-def get_sheet_df(session_id: str, sheet_name: str) -> pd.DataFrame:
-    if session_id not in _EXCEL_CACHE:
-        raise KeyError("Excel data not loaded for this session.")
-    sheets = _EXCEL_CACHE[session_id]
-    if sheet_name not in sheets:
-        raise KeyError(f"Sheet '{sheet_name}' not found for this session.")
-    return sheets[sheet_name]
+import threading
+from typing import Any, Callable, Dict, List
+import pandas as pd
+from models.common_models import SheetInfo
+
+# In-memory cache of loaded Excel files per session.
+# Each sheet maps to an entry dict holding the raw dataframe plus
+# lazily-memoized visualization artefacts:
+#   _EXCEL_CACHE[session_id][sheet_name] = {
+#       "raw": df,           # as parsed from Excel
+#       "prepared": df2,     # after viz preparation (datetime coercion)
+#       "dtypes": {...},     # column classification for suggestions
+#   }
+_EXCEL_CACHE: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+# Guards the lazy memoization below: FastAPI handlers run in a threadpool,
+# so two requests for the same sheet must not both compute prepare_fn.
+_CACHE_LOCK = threading.Lock()
+
+def load_excel_for_session(session_id: str, file_path: str) -> List[SheetInfo]:
+    """
+    Read Excel file and store per-session sheet dataframes in cache.
+    Returns metadata for all sheets.
+    """
+    # calamine (Rust-backed) parses .xlsx far faster than openpyxl and
+    # returns all sheets in a single pass
+    sheet_dfs = pd.read_excel(file_path, sheet_name=None, engine="calamine")
+    sheet_infos: List[SheetInfo] = []
+    sheet_entries: Dict[str, Dict[str, Any]] = {}
+
+    for sheet_name, df in sheet_dfs.items():
+        sheet_entries[sheet_name] = {"raw": df, "prepared": None, "dtypes": None}
+        sheet_infos.append(
+            SheetInfo(
+                sheet_name=sheet_name,
+                n_rows=int(df.shape[0]),
+                n_cols=int(df.shape[1])
+            )
+        )
+
+    _EXCEL_CACHE[session_id] = sheet_entries
+    return sheet_infos
+
+def _get_sheet_entry(session_id: str, sheet_name: str) -> Dict[str, Any]:
+    if session_id not in _EXCEL_CACHE:
+        raise KeyError("Excel data not loaded for this session.")
+    sheets = _EXCEL_CACHE[session_id]
+    if sheet_name not in sheets:
+        raise KeyError(f"Sheet '{sheet_name}' not found for this session.")
+    return sheets[sheet_name]
+
+def get_sheet_names(session_id: str) -> List[str]:
+    if session_id not in _EXCEL_CACHE:
+        raise KeyError("Excel data not loaded for this session.")
+    return list(_EXCEL_CACHE[session_id].keys())
+
+def get_sheet_df(session_id: str, sheet_name: str) -> pd.DataFrame:
+    return _get_sheet_entry(session_id, sheet_name)["raw"]
+
+def get_prepared_df(
+    session_id: str, sheet_name: str, prepare_fn: Callable[[pd.DataFrame], pd.DataFrame]
+) -> pd.DataFrame:
+    """
+    Return the viz-prepared dataframe for a sheet, computing it with
+    prepare_fn on first access and memoizing it for later calls.
+    """
+    entry = _get_sheet_entry(session_id, sheet_name)
+    if entry["prepared"] is None:
+        with _CACHE_LOCK:
+            if entry["prepared"] is None:
+                entry["prepared"] = prepare_fn(entry["raw"])
+    return entry["prepared"]
+
+def get_column_types(
+    session_id: str, sheet_name: str, classify_fn: Callable[[pd.DataFrame], Dict[str, str]]
+) -> Dict[str, str]:
+    """
+    Return the column-type classification for a sheet, memoized like
+    get_prepared_df. Classification runs on the prepared dataframe when
+    one has been computed, otherwise on the raw one.
+    """
+    entry = _get_sheet_entry(session_id, sheet_name)
+    if entry["dtypes"] is None:
+        with _CACHE_LOCK:
+            if entry["dtypes"] is None:
+                df = entry["prepared"] if entry["prepared"] is not None else entry["raw"]
+                entry["dtypes"] = classify_fn(df)
+    return entry["dtypes"]
@@ -1,336 +1,498 @@
-from typing import List, Optional, Dict, Any, Tuple
-import io
-import base64
-import warnings
-
-import numpy as np
-import pandas as pd
-import matplotlib
-
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-from concurrent.futures import ProcessPoolExecutor
-
-from services.viz_cache import get_cached_visualizations, store_visualizations
-from services.excel_reader_service import _EXCEL_CACHE, get_sheet_df
-from models.common_models import VizConfig
-
-warnings.filterwarnings("ignore", category=UserWarning)
-
-#Covert date object datatype to string datatype
-def _prepare_df_for_viz(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Return a copy of df with:
-    - object-like date columns converted to datetime (if mostly parsable)
-    """
-    df = df.copy()
-
-    for col in df.columns:
-        if df[col].dtype == "object":
-            # Try to parse as datetime
-            try:
-                parsed = pd.to_datetime(df[col], errors="coerce", infer_datetime_format=True)
-                non_null = df[col].notna().sum()
-                parsed_non_null = parsed.notna().sum()
-
-                # Heuristic: at least 70% of non-null values parse to valid datetimes
-                if non_null > 0 and parsed_non_null / non_null >= 0.7:
-                    df[col] = parsed
-            except Exception:
-                # Leave as-is if parsing fails badly
-                pass
-
-    return df
-
-def get_column_datatype(df: pd.DataFrame) ->Dict[str, str]:
-    datatype = {}
-    for col in df.columns:
-        series = df[col]
-        if pd.api.types.is_numeric_dtype(series):
-            datatype[col] = "numerical"
-        elif np.issubdtype(df[col].dtype, np.datetime64) or any(elem in col.lower() for elem in ['date', 'time']):
-            datatype[col] = "datetime"
-        else:
-            count = int(series.count())
-            unique = int(series.nunique())
-            if count == unique:
-                if 'id' in col.lower():
-                    datatype[col] = "primary_key"
-                else:
-                    datatype[col] = "distinct_categorical"
-            else:
-                if 'id' in col.lower():
-                    datatype[col] = "foreign_key"
-                else:
-                    datatype[col] = "categorical"
-    return datatype
-
-def generate_manual_suggestions(df: pd.DataFrame) -> Optional[List[dict]]:
-    datatype = get_column_datatype(df)
-    manual_sug = []
-    for col in df.columns:
-        if datatype[col] == "categorical":
-            manual_sug.append({
-                "chart_type": "bar",
-                "x": col,
-                "y": None,
-                "description": f"Count of {col}"
-            })
-        elif datatype[col] == "numerical":
-            manual_sug.append({
-                "chart_type": "histogram",
-                "x": col,
-                "y": None,
-                "description": f"Distribution of {col}"
-            })
-    numerical, date = [], []
-    for key, value in datatype.items():
-        if value == "numerical":
-            numerical.append(key)
-        if value == "datetime":
-            date.append(key)
-    for i in range(len(numerical)-1):
-        for j in range(i+1, len(numerical)):
-            chart_sug = {
-                "chart_type": "scatter",
-                "x": numerical[i],
-                "y": numerical[j],
-                "description": f"Relationship between {numerical[i]} and {numerical[j]}"
-            }
-            manual_sug.append(chart_sug)
-    if len(date) == 1:
-        for item in numerical:
-            chart_sug = {
-                "chart_type": "line",
-                "x": date[0],
-                "y": item,
-                "description": f"Trend of {item} over date"
-            }
-            manual_sug.append(chart_sug)
-    return manual_sug
-
-def _clean_and_validate_suggestions(df: pd.DataFrame, raw_suggestions: Optional[List[dict]]) -> List[dict]:
-    if not raw_suggestions or not isinstance(raw_suggestions, list):
-        return []
-
-    cols = set(df.columns)
-    seen = set()
-    cleaned: List[dict] = []
-
-    for item in raw_suggestions:
-        if not isinstance(item, dict):
-            continue
-
-        chart_type = str(item.get("chart_type", "")).strip().lower()
-        x = item.get("x")
-        y = item.get("y", None)
-        desc = item.get("description", "")
-
-        if not chart_type or x is None:
-            continue
-        if x not in cols:
-            continue
-        if y is not None and y not in cols:
-            continue
-
-        # scatter/line require y
-        if chart_type in ["scatter", "line"] and y is None:
-            continue
-
-        # Basic valid chart types
-        if chart_type not in ["histogram", "scatter", "bar", "countplot", "line"]:
-            continue
-
-        key = (chart_type, x, y)
-        if key in seen:
-            continue
-        seen.add(key)
-
-        cleaned.append(
-            {
-                "chart_type": chart_type,
-                "x": x,
-                "y": y,
-                "description": desc,
-            }
-        )
-
-    return cleaned
-
-def _get_viz_suggestions_for_df(df: pd.DataFrame) -> List[dict]:
-    """
-    High-level helper:
-    - prepare df (datetime conversion)
-    - validate & clean final list
-    """
-    df_prepared = _prepare_df_for_viz(df)
-
-    raw_suggestions = generate_manual_suggestions(df_prepared)
-    cleaned = _clean_and_validate_suggestions(df_prepared, raw_suggestions)
-    return cleaned
-
-def generate_chart(df: pd.DataFrame, chart_type: str, x: str, y: Optional[str] = None) -> Optional[str]:
-    """
-    Generate a single chart and return a base64-encoded PNG string.
-    Returns None if an error occurs.
-    """
-    if x not in df.columns:
-        print(f"CHART ERROR: x='{x}' not in columns")
-        return None
-    if y is not None and y not in df.columns:
-        print(f"CHART ERROR: y='{y}' not in columns")
-        return None
-
-    print(f"\n=== GENERATE CHART ===")
-    print("Chart type:", chart_type)
-    print("X:", x)
-    print("Y:", y)
-    print("Column dtype:", df[x].dtype)
-    print("======================\n")
-
-    plt.figure(figsize=(8, 5))
-
-    try:
-        # histogram
-        if chart_type == "histogram":
-            print("Plot: histogram")
-            # If x is not numeric, fall back to countplot
-            if not np.issubdtype(df[x].dtype, np.number):
-                print("Non-numeric for histogram; using countplot instead.")
-                sns.countplot(data=df, x=x)
-            else:
-                sns.histplot(df[x].dropna(), kde=True)
-
-        # scatter
-        elif chart_type == "scatter":
-            print("Plot: scatter")
-            sns.scatterplot(data=df, x=x, y=y)
-
-        # bar / countplot-like
-        elif chart_type == "bar":
-            print("Plot: bar")
-            if y:
-                sns.barplot(data=df, x=x, y=y)
-            else:
-                # SPECIAL HANDLING — datetime breaks countplot
-                if np.issubdtype(df[x].dtype, np.datetime64):
-                    print("Converting datetime to string for countplot")
-                    temp = df.copy()
-                    temp[x] = temp[x].dt.strftime("%Y-%m-%d")
-                    sns.countplot(data=temp, x=x)
-                else:
-                    sns.countplot(data=df, x=x)
-
-        elif chart_type == "countplot":
-            print("Plot: countplot")
-            sns.countplot(data=df, x=x)
-
-        # line
-        elif chart_type == "line":
-            print("Plot: line")
-            sns.lineplot(data=df, x=x, y=y)
-
-        else:
-            print("UNKNOWN CHART TYPE")
-            return None
-
-        buffer = io.BytesIO()
-        plt.tight_layout()
-        plt.savefig(buffer, format="png")
-        plt.close()
-        buffer.seek(0)
-
-        data = buffer.read()
-        print("PNG bytes length:", len(data))
-        return base64.b64encode(data).decode("utf-8")
-
-    except Exception as e:
-        print("CHART ERROR:", e)
-        plt.close()
-        return None
-
-def _render_chart_process(task: Tuple[str, pd.DataFrame, str, str, Optional[str], str]):
-    """
-    Executed in separate processes.
-    task = (sheet_name, df, chart_type, x, y, description)
-    Returns (sheet_name, chart_type, x, y, description, image_base64)
-    """
-    sheet_name, df, chart_type, x, y, desc = task
-    img = generate_chart(df, chart_type, x, y)
-    return sheet_name, chart_type, x, y, desc, img
-
-
-
-def suggest_visualizations_for_all_sheets(
-    session_id: str, user_filters: Optional[Dict[str, List[str]]] = None
-) -> Dict[str, List[VizConfig]]:
-    """
-    Generate visualizations for ALL sheets in a session, with:
-    - caching
-    - multiprocessing chart rendering
-    - optional user-selected chart type filters
-
-    Returns:
-        { sheet_name: [VizConfig, VizConfig, ...], ... }
-    """
-
-    # 1. Check cache
-    cached = get_cached_visualizations(session_id, mode="manual")
-    if cached:
-        return cached
-
-    sheet_dfs = _EXCEL_CACHE.get(session_id)
-    if not sheet_dfs:
-        raise KeyError("Sheets not loaded.")
-
-    tasks: List[Tuple[str, pd.DataFrame, str, str, Optional[str], str]] = []
-
-    # 2. Build tasks for all sheets
-    for sheet_name, df_raw in sheet_dfs.items():
-        df = _prepare_df_for_viz(df_raw)
-        suggestions = _get_viz_suggestions_for_df(df)
-
-        # If user provided allowed chart types per sheet, filter here
-        if user_filters and sheet_name in user_filters:
-            allowed_types = set(user_filters[sheet_name])
-            suggestions = [s for s in suggestions if s.get("chart_type") in allowed_types]
-
-        for s in suggestions:
-            chart_type = s.get("chart_type")
-            x = s.get("x")
-            y = s.get("y")
-            desc = s.get("description", "")
-
-            tasks.append((sheet_name, df, chart_type, x, y, desc))
-
-    # If no tasks at all, return empty
-    if not tasks:
-        store_visualizations(session_id, {})
-        return {}
-
-    # 3. Run chart rendering in parallel
-    final_result: Dict[str, List[VizConfig]] = {}
-
-    with ProcessPoolExecutor() as executor:
-        results = list(executor.map(_render_chart_process, tasks))
-
-    # 4. Collect results into VizConfig objects
-    for sheet_name, chart_type, x, y, desc, img in results:
-        if sheet_name not in final_result:
-            final_result[sheet_name] = []
-
-        final_result[sheet_name].append(
-            VizConfig(
-                chart_type=chart_type,
-                x=x,
-                y=y,
-                description=desc,
-                image_base64=img,
-            )
-        )
-
-    # 5. Cache & return
-    store_visualizations(session_id, final_result, mode="manual")
-    return final_result
+from typing import List, Optional, Dict, Any, Tuple
+import logging
+import warnings
+
+import cv2
+
+import numpy as np
+import pandas as pd
+import matplotlib
+
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import seaborn as sns
+
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import pyarrow as pa
+
+from services.viz_cache import get_cached_visualizations, store_chart_image, store_visualizations
+from services.excel_reader_service import (
+    get_column_types,
+    get_prepared_df,
+    get_sheet_names,
+)
+from models.common_models import VizConfig
+
+warnings.filterwarnings("ignore", category=UserWarning)
+
+logger = logging.getLogger(__name__)
+
+#Covert date object datatype to string datatype
+def _prepare_df_for_viz(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return a copy of df with:
+    - object-like date columns converted to datetime (if mostly parsable)
+
+    Detection runs on a small sample first, so non-date columns never pay
+    a full-column parse; accepted columns are then parsed once, with an
+    explicit format when one can be inferred from the sample.
+    """
+    df = df.copy()
+
+    for col in df.columns:
+        if df[col].dtype != "object":
+            continue
+
+        non_null = df[col].dropna()
+        if non_null.empty:
+            continue
+
+        # Decide on a sample instead of parsing the whole column
+        sample = non_null.sample(min(1000, len(non_null)), random_state=0)
+        try:
+            parsed_sample = pd.to_datetime(sample, errors="coerce")
+        except Exception:
+            continue
+
+        # Heuristic: at least 70% of sampled values parse to valid datetimes
+        if parsed_sample.notna().mean() < 0.7:
+            continue
+
+        try:
+            fmt = pd.tseries.api.guess_datetime_format(str(sample.iloc[0]))
+        except Exception:
+            fmt = None
+
+        try:
+            # Explicit format avoids per-element inference (10-50x faster);
+            # fall back to inference when formats are mixed.
+            if fmt:
+                parsed = pd.to_datetime(df[col], format=fmt, errors="coerce", cache=True)
+                if parsed.notna().sum() / len(non_null) < 0.7:
+                    parsed = pd.to_datetime(df[col], errors="coerce", cache=True)
+            else:
+                parsed = pd.to_datetime(df[col], errors="coerce", cache=True)
+
+            if parsed.notna().sum() / len(non_null) >= 0.7:
+                df[col] = parsed
+        except Exception:
+            # Leave as-is if parsing fails badly
+            pass
+
+    return df
+
+def get_column_datatype(df: pd.DataFrame) ->Dict[str, str]:
+    # Precompute dtypes and lowercased names once; count()/nunique() run
+    # as one vectorized pass over the remaining columns instead of being
+    # re-invoked per column inside the loop.
+    dtypes = df.dtypes
+    lowers = {col: col.lower() for col in df.columns}
+
+    datatype: Dict[str, str] = {}
+    other_cols: List[str] = []
+
+    for col in df.columns:
+        dtype = dtypes[col]
+        if pd.api.types.is_numeric_dtype(dtype):
+            datatype[col] = "numerical"
+        elif np.issubdtype(dtype, np.datetime64) or any(elem in lowers[col] for elem in ('date', 'time')):
+            datatype[col] = "datetime"
+        else:
+            other_cols.append(col)
+
+    if other_cols:
+        counts = df[other_cols].count()
+        uniques = df[other_cols].nunique(dropna=True)
+        for col in other_cols:
+            if int(counts[col]) == int(uniques[col]):
+                if 'id' in lowers[col]:
+                    datatype[col] = "primary_key"
+                else:
+                    datatype[col] = "distinct_categorical"
+            else:
+                if 'id' in lowers[col]:
+                    datatype[col] = "foreign_key"
+                else:
+                    datatype[col] = "categorical"
+    return datatype
+
+def generate_manual_suggestions(
+    df: pd.DataFrame, datatype: Optional[Dict[str, str]] = None
+) -> List[dict]:
+    """
+    Emit already-clean suggestions: every chart_type/x/y comes straight
+    from the column classification of this df, so no separate validation
+    pass is needed (unlike LLM output in viz_service). Dedup happens
+    inline via a (chart_type, x, y) seen-set.
+    """
+    if datatype is None:
+        datatype = get_column_datatype(df)
+
+    manual_sug: List[dict] = []
+    seen = set()
+
+    def _add(chart_type: str, x: str, y: Optional[str], description: str):
+        key = (chart_type, x, y)
+        if key in seen:
+            return
+        seen.add(key)
+        manual_sug.append({
+            "chart_type": chart_type,
+            "x": x,
+            "y": y,
+            "description": description
+        })
+
+    for col in df.columns:
+        if datatype[col] == "categorical":
+            _add("bar", col, None, f"Count of {col}")
+        elif datatype[col] == "numerical":
+            _add("histogram", col, None, f"Distribution of {col}")
+    numerical, date = [], []
+    for key, value in datatype.items():
+        if value == "numerical":
+            numerical.append(key)
+        if value == "datetime":
+            date.append(key)
+    # Scatter only for correlated pairs (|Pearson r| > 0.3) instead of
+    # every numeric pair — otherwise a 30-column sheet renders 435 charts.
+    # The corr matrix is one vectorized pass; pair selection is O(1) per pair.
+    if len(numerical) >= 2:
+        corr = df[numerical].corr(method="pearson").abs().to_numpy()
+        iu, ju = np.triu_indices(len(numerical), k=1)
+        for i, j in zip(iu.tolist(), ju.tolist()):
+            if not corr[i, j] > 0.3:
+                continue
+            _add(
+                "scatter",
+                numerical[i],
+                numerical[j],
+                f"Relationship between {numerical[i]} and {numerical[j]}",
+            )
+    if len(date) == 1:
+        for item in numerical:
+            _add("line", date[0], item, f"Trend of {item} over date")
+    return manual_sug
+
+def _get_viz_suggestions_for_df(
+    df: pd.DataFrame, datatype: Optional[Dict[str, str]] = None
+) -> List[dict]:
+    """
+    High-level helper over an already-prepared df. Manual suggestions
+    are emitted clean and deduped by the generator itself; the separate
+    validation pass only exists for untrusted (LLM) suggestions in
+    viz_service.
+    """
+    return generate_manual_suggestions(df, datatype)
+
+def _counts_bar(ax, series: pd.Series, xlabel: str) -> None:
+    # Aggregate first: countplot re-groups the raw column inside seaborn,
+    # while value_counts + bar hands matplotlib at most 50 values
+    vc = series.value_counts().head(50)
+    ax.bar(vc.index.astype(str), vc.values)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel("count")
+
+
+def _histogram(ax, series: pd.Series) -> None:
+    arr = series.dropna().to_numpy()
+    if arr.size <= 100_000:
+        sns.histplot(arr, kde=True, ax=ax)
+    else:
+        # Bin with numpy and draw 30 steps instead of shipping every raw
+        # value through seaborn; KDE is skipped at this size
+        counts, edges = np.histogram(arr, bins=30)
+        ax.stairs(counts, edges, fill=True)
+        ax.set_ylabel("count")
+
+
+def generate_chart(df: pd.DataFrame, chart_type: str, x: str, y: Optional[str] = None) -> Optional[bytes]:
+    """
+    Generate a single chart and return the encoded JPEG bytes.
+    Returns None if an error occurs.
+    """
+    if x not in df.columns:
+        logger.error("Chart error: x=%r not in columns", x)
+        return None
+    if y is not None and y not in df.columns:
+        logger.error("Chart error: y=%r not in columns", y)
+        return None
+
+    # debug-gated: with hundreds of charts across worker processes,
+    # unconditional prints are measurable overhead
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Generate chart: type=%s x=%s y=%s dtype=%s",
+            chart_type, x, y, df[x].dtype,
+        )
+
+    # Streamlit shows these at 300px wide; 4.5x3 in @ 90 dpi (405x270)
+    # renders ~3x fewer pixels than the old 800x500 with no visible loss.
+    # A private Figure instead of plt.figure(): no Gcf registry entry to
+    # track and close, and no pyplot global state shared between renders.
+    fig = Figure(figsize=(4.5, 3), dpi=90)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.subplots()
+
+    try:
+        # histogram
+        if chart_type == "histogram":
+            # If x is not numeric, fall back to countplot
+            if not np.issubdtype(df[x].dtype, np.number):
+                logger.debug("Non-numeric for histogram; using countplot instead.")
+                _counts_bar(ax, df[x], x)
+            else:
+                _histogram(ax, df[x])
+                ax.set_xlabel(x)
+
+        # scatter
+        elif chart_type == "scatter":
+            # 10k points already oversaturate a 405x270 canvas; drawing
+            # more only costs Agg time
+            d = df.sample(10_000, random_state=0) if len(df) > 10_000 else df
+            sns.scatterplot(data=d, x=x, y=y, ax=ax)
+
+        # bar / countplot-like
+        elif chart_type == "bar":
+            if y:
+                sns.barplot(data=df, x=x, y=y, ax=ax)
+            else:
+                # SPECIAL HANDLING — datetime breaks countplot
+                if np.issubdtype(df[x].dtype, np.datetime64):
+                    # Aggregate the one column instead of copying the whole
+                    # frame; plain bar also skips countplot's category/hue
+                    # bookkeeping
+                    counts = df[x].dt.strftime("%Y-%m-%d").value_counts().sort_index()
+                    ax.bar(counts.index, counts.values)
+                    ax.set_xlabel(x)
+                    ax.set_ylabel("count")
+                else:
+                    _counts_bar(ax, df[x], x)
+
+        elif chart_type == "countplot":
+            _counts_bar(ax, df[x], x)
+
+        # line
+        elif chart_type == "line":
+            # Uniform stride keeps the x-order intact, unlike sampling
+            step = max(1, len(df) // 10_000)
+            d = df.iloc[::step] if step > 1 else df
+            sns.lineplot(data=d, x=x, y=y, ax=ax)
+
+        else:
+            logger.warning("Unknown chart type: %s", chart_type)
+            return None
+
+        fig.tight_layout()
+        canvas.draw()
+
+        # Grab the rendered RGBA pixels directly (zero-copy) and
+        # JPEG-encode with OpenCV — much faster than savefig's zlib PNG
+        # path, and roughly half the bytes shipped to Streamlit.
+        arr = np.asarray(canvas.buffer_rgba())
+
+        ok, encoded = cv2.imencode(
+            ".jpg",
+            cv2.cvtColor(arr, cv2.COLOR_RGBA2BGR),
+            [cv2.IMWRITE_JPEG_QUALITY, 75],
+        )
+        if not ok:
+            logger.error("Chart error: JPEG encode failed")
+            return None
+
+        data = encoded.tobytes()
+        logger.debug("JPEG bytes length: %d", len(data))
+        return data
+
+    except Exception:
+        logger.exception("Chart error (type=%s x=%s y=%s)", chart_type, x, y)
+        return None
+
+def _df_to_shared_memory(df: pd.DataFrame) -> shared_memory.SharedMemory:
+    """
+    Serialize df once as an Arrow IPC stream into a SharedMemory block.
+    Workers attach by name, so the df is never pickled per task.
+    """
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type object columns (a text column with a stray numeric
+        # cell is routine in real spreadsheets) have no Arrow type; the
+        # charts treat them as categories anyway, so stringify the
+        # non-null values and retry. Nulls stay NaN for dropna/counts.
+        df = df.copy()
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].astype(str).where(df[col].notna())
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    buf = sink.getvalue()
+
+    shm = shared_memory.SharedMemory(create=True, size=buf.size)
+    # Arrow buffers export a signed-byte memoryview, which the 'B'-typed
+    # shm.buf refuses to accept directly; recast before assigning
+    shm.buf[: buf.size] = memoryview(buf).cast("B")
+    return shm
+
+
+def _init_render_worker():
+    """Preimport the heavy render deps once per worker process."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.backends.backend_agg  # noqa: F401
+    import seaborn  # noqa: F401
+    import cv2  # noqa: F401
+
+
+# Persistent render pool. A fresh ProcessPoolExecutor per request pays
+# interpreter startup + matplotlib import (~0.5-1s) per worker every
+# time; forkserver workers instead preload the render stack once and
+# are reused across requests.
+_POOL = ProcessPoolExecutor(
+    max_workers=os.cpu_count(),
+    mp_context=multiprocessing.get_context("forkserver"),
+    initializer=_init_render_worker,
+)
+atexit.register(_POOL.shutdown)
+
+
+# Per-worker cache of DataFrames reconstructed from shared memory,
+# keyed by shm name (populated inside worker processes).
+_SHM_DF_CACHE: Dict[str, pd.DataFrame] = {}
+
+
+def _df_from_shared_memory(shm_name: str) -> pd.DataFrame:
+    df = _SHM_DF_CACHE.get(shm_name)
+    if df is None:
+        # shm names are unique per request; don't let old entries pile
+        # up now that workers outlive a single request
+        if len(_SHM_DF_CACHE) > 32:
+            _SHM_DF_CACHE.clear()
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            # Copy the stream out before closing: parsing straight from
+            # shm.buf leaves exported memoryviews alive (the IPC reader
+            # and any zero-copy arrow columns), and close() then raises
+            # BufferError — and the parent unlinks the block anyway
+            data = bytes(shm.buf)
+        finally:
+            shm.close()
+        df = pa.ipc.open_stream(pa.py_buffer(data)).read_all().to_pandas()
+        _SHM_DF_CACHE[shm_name] = df
+    return df
+
+
+def _render_chart_process(task: Tuple[str, str, str, str, Optional[str], str]):
+    """
+    Executed in separate processes.
+    task = (sheet_name, shm_name, chart_type, x, y, description)
+    Returns (sheet_name, chart_type, x, y, description, image_base64)
+    """
+    sheet_name, shm_name, chart_type, x, y, desc = task
+    df = _df_from_shared_memory(shm_name)
+    img = generate_chart(df, chart_type, x, y)
+    return sheet_name, chart_type, x, y, desc, img
+
+
+
+def suggest_visualizations_for_all_sheets(
+    session_id: str,
+    user_filters: Optional[Dict[str, List[str]]] = None,
+    cache_key: Optional[str] = None,
+) -> Dict[str, List[VizConfig]]:
+    """
+    Generate visualizations for ALL sheets in a session, with:
+    - caching
+    - multiprocessing chart rendering
+    - optional user-selected chart type filters
+
+    Returns:
+        { sheet_name: [VizConfig, VizConfig, ...], ... }
+    """
+
+    # 1. Check cache — keyed by file-content hash when available, so the
+    #    same file re-uploaded under a new session_id still hits
+    cache_key = cache_key or session_id
+    cached = get_cached_visualizations(cache_key, mode="manual")
+    if cached:
+        return cached
+
+    sheet_names = get_sheet_names(session_id)
+    if not sheet_names:
+        raise KeyError("Sheets not loaded.")
+
+    tasks: List[Tuple[str, str, str, str, Optional[str], str]] = []
+    shm_blocks: List[shared_memory.SharedMemory] = []
+
+    # 2. Build tasks for all sheets; each sheet's df is shared once via
+    #    Arrow IPC in shared memory, tasks carry only the shm name.
+    try:
+        for sheet_name in sheet_names:
+            # Prepared df + column types are memoized per (session, sheet)
+            # in the excel cache, so repeat requests skip the re-parse.
+            df = get_prepared_df(session_id, sheet_name, _prepare_df_for_viz)
+            datatype = get_column_types(session_id, sheet_name, get_column_datatype)
+            suggestions = _get_viz_suggestions_for_df(df, datatype)
+
+            # If user provided allowed chart types per sheet, filter here
+            if user_filters and sheet_name in user_filters:
+                allowed_types = set(user_filters[sheet_name])
+                suggestions = [s for s in suggestions if s.get("chart_type") in allowed_types]
+
+            if not suggestions:
+                continue
+
+            shm = _df_to_shared_memory(df)
+            shm_blocks.append(shm)
+
+            for s in suggestions:
+                chart_type = s.get("chart_type")
+                x = s.get("x")
+                y = s.get("y")
+                desc = s.get("description", "")
+
+                tasks.append((sheet_name, shm.name, chart_type, x, y, desc))
+
+        # If no tasks at all, return empty
+        if not tasks:
+            store_visualizations(cache_key, {}, mode="manual")
+            return {}
+
+        # 3. Run chart rendering on the persistent pool
+        results = list(_POOL.map(_render_chart_process, tasks))
+    finally:
+        for shm in shm_blocks:
+            shm.close()
+            shm.unlink()
+
+    final_result: Dict[str, List[VizConfig]] = {}
+
+    # 4. Collect results into VizConfig objects; image bytes go to the
+    #    chart store and only the id travels in the JSON payload
+    for sheet_name, chart_type, x, y, desc, img in results:
+        if sheet_name not in final_result:
+            final_result[sheet_name] = []
+
+        image_id = store_chart_image(session_id, img, "jpeg") if img else None
+
+        final_result[sheet_name].append(
+            VizConfig(
+                chart_type=chart_type,
+                x=x,
+                y=y,
+                description=desc,
+                image_id=image_id,
+                chart_format="jpeg",
+            )
+        )
+
+    # 5. Cache & return
+    store_visualizations(cache_key, final_result, mode="manual")
+    return final_result
@@ -1,45 +1,58 @@
-from sqlalchemy.orm import Session
-from database import SessionLocal
-from models.session_db_model import SessionDB
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-def create_session(session_id: str, file_path: str, file_name: str, domain: str, meta: dict = {}):
-    db = SessionLocal()
-    session = SessionDB(
-        session_id=session_id,
-        file_path=file_path,
-        file_name=file_name,
-        domain=domain,
-        meta=meta
-    )
-    db.add(session)
-    db.commit()
-    db.refresh(session)
-    return session
-
-
-def get_session_by_file_name(file_name: str):
-    db = SessionLocal()
-    return db.query(SessionDB).filter(SessionDB.file_name == file_name).first()
-
-
-def get_session(session_id: str):
-    db = SessionLocal()
-    return db.query(SessionDB).filter(SessionDB.session_id == session_id).first()
-
-
-def update_session_meta(session_id: str, key: str, value):
-    db = SessionLocal()
-    session = db.query(SessionDB).filter(SessionDB.session_id == session_id).first()
-
-    if session:
-        session.meta[key] = value
-        db.commit()
-    return session
+from typing import Dict, Optional
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models.session_db_model import SessionDB
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Process-local cache of session rows by id. Sessions are written once
+# at upload time, so serving lookups from here lets /data/* requests
+# skip a connection checkout + query.
+_SESSION_CACHE: Dict[str, SessionDB] = {}
+
+
+def create_session(db: Session, session_id: str, file_path: str, file_name: str, domain: str, meta: dict = {}):
+    session = SessionDB(
+        session_id=session_id,
+        file_path=file_path,
+        file_name=file_name,
+        domain=domain,
+        meta=meta
+    )
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    _SESSION_CACHE[session_id] = session
+    return session
+
+
+def get_session_by_file_name(db: Session, file_name: str) -> Optional[SessionDB]:
+    return db.query(SessionDB).filter(SessionDB.file_name == file_name).first()
+
+
+def get_session(db: Session, session_id: str) -> Optional[SessionDB]:
+    cached = _SESSION_CACHE.get(session_id)
+    if cached is not None:
+        return cached
+
+    session = db.query(SessionDB).filter(SessionDB.session_id == session_id).first()
+    if session is not None:
+        _SESSION_CACHE[session_id] = session
+    return session
+
+
+def update_session_meta(db: Session, session_id: str, key: str, value):
+    session = db.query(SessionDB).filter(SessionDB.session_id == session_id).first()
+
+    if session:
+        session.meta[key] = value
+        db.commit()
+        db.refresh(session)
+        _SESSION_CACHE[session_id] = session
+    return session
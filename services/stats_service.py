@@ -1,34 +1,104 @@
+import math
 from typing import Dict, Any
 import numpy as np
 import pandas as pd
+from numba import njit, prange
 from .excel_reader_service import get_sheet_df
 
+# No fastmath here: its nnan assumption lets LLVM fold math.isnan to
+# False, which silently counts NaNs into the stats
+@njit(cache=True)
+def _nan_stats(a):
+    """Fused nan-aware (count, sum, min, max) in one pass over a float64 array.
+
+    Replaces four separate pandas reductions (count/mean/min/max), each of
+    which re-masks NaN on its own traversal.
+    """
+    count = 0
+    total = 0.0
+    mn = math.inf
+    mx = -math.inf
+    for i in range(a.size):
+        v = a[i]
+        if not math.isnan(v):
+            count += 1
+            total += v
+            if v < mn:
+                mn = v
+            if v > mx:
+                mx = v
+    return count, total, mn, mx
+
+@njit(cache=True, parallel=True)
+def _col_stats(arr):
+    """Run _nan_stats over every column of a 2D float64 array in parallel.
+
+    Columns are independent, so prange fans them out across cores with the
+    GIL released; returns an (n_cols, 4) array of (count, sum, min, max).
+    """
+    out = np.empty((arr.shape[1], 4))
+    for j in prange(arr.shape[1]):
+        n, total, mn, mx = _nan_stats(arr[:, j])
+        out[j, 0] = n
+        out[j, 1] = total
+        out[j, 2] = mn
+        out[j, 3] = mx
+    return out
+
 def get_statistical_summary(session_id: str, sheet_name: str) -> Dict[str, Any]:
     df = get_sheet_df(session_id, sheet_name)
 
     summary = {}
 
+    # Shared precomputation: dtypes and non-null counts are one
+    # vectorized pass each instead of per-column calls inside the loop
+    dtypes = df.dtypes
+    counts = df.count()
+
+    # All numeric columns go through one parallel kernel call up front
+    numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(dtypes[c])]
+    num_idx = {c: i for i, c in enumerate(numeric_cols)}
+    if numeric_cols:
+        num_stats = _col_stats(df[numeric_cols].to_numpy(dtype=np.float64))
+
     for col in df.columns:
         series = df[col]
+        col_lower = col.lower()
+        count = int(counts[col])
 
         # -------------- NUMERICAL ----------------
-        if pd.api.types.is_numeric_dtype(series):
+        if col in num_idx:
+            n, total, mn, mx = num_stats[num_idx[col]]
+            n = int(n)
             summary[col] = {
                 "type": "numerical",
-                "count": int(series.count()),
-                "mean": float(series.mean()) if series.count() > 0 else None,
-                "min": float(series.min()) if series.count() > 0 else None,
-                "max": float(series.max()) if series.count() > 0 else None,
+                "count": n,
+                "mean": float(total) / n if n > 0 else None,
+                "min": float(mn) if n > 0 else None,
+                "max": float(mx) if n > 0 else None,
             }
 
         # -------------- CATEGORICAL / OBJECT ----------------
         else:
-            count = int(series.count())
-            unique = int(series.nunique())
+            # Fast path for ID-like columns: is_unique is a single hash
+            # pass with no counts retained, so a clean key column skips
+            # factorize entirely
+            if 'id' in col_lower and series.is_unique:
+                summary[col] = {
+                    "type": "primary_key",
+                    "count": count
+                }
+                continue
+
+            # factorize hashes the column once into integer codes; counts
+            # then come from np.bincount in vectorized C instead of
+            # value_counts building a hash table over the strings again
+            codes, uniques = pd.factorize(series, sort=False)
+            unique = len(uniques)
 
             # PRIMARY KEY CASE
             if count == unique:
-                if 'id' in col.lower():
+                if 'id' in col_lower:
                     summary[col] = {
                         "type": "primary_key",
                         "count": count
@@ -39,11 +109,14 @@ def get_statistical_summary(session_id: str, sheet_name: str) -> Dict[str, Any]:
                         "count": count
                     }
             else:
-                freq_val = series.value_counts().idxmax()
-                freq_num = int(series.value_counts().max())
-                if 'id' in col.lower():
+                # Only non-unique columns need the frequency table
+                code_counts = np.bincount(codes[codes >= 0])
+                argmax = int(code_counts.argmax())
+                freq_val = uniques[argmax]
+                freq_num = int(code_counts[argmax])
+                if 'id' in col_lower:
                     cat = "foreign_key"
-                elif 'date' in col.lower() or 'time' in col.lower():
+                elif 'date' in col_lower or 'time' in col_lower:
                     cat = "datetime"
                 else:
                     cat = "categorical"
@@ -56,8 +129,13 @@ def get_statistical_summary(session_id: str, sheet_name: str) -> Dict[str, Any]:
                     "freq_num": freq_num
                 }
 
-    missing_counts = df.isna().sum().to_dict()
-    missing_pct = (df.isna().mean() * 100).round(2).to_dict()
+    # Build the NA mask once and derive count and percent from the same
+    # reduction instead of scanning the frame twice
+    n_rows = len(df)
+    na_counts = df.isna().to_numpy().sum(axis=0)
+    na_pct = np.round(na_counts * (100.0 / n_rows), 2) if n_rows else na_counts * 0.0
+    missing_counts = dict(zip(df.columns, (int(n) for n in na_counts)))
+    missing_pct = dict(zip(df.columns, (float(p) for p in na_pct)))
 
     return {
         "summary": summary,
@@ -65,7 +143,7 @@ def get_statistical_summary(session_id: str, sheet_name: str) -> Dict[str, Any]:
             "count": missing_counts,
             "percent": missing_pct
         },
-        "n_rows": int(df.shape[0]),
+        "n_rows": n_rows,
         "n_cols": int(df.shape[1])
     }
  
\ No newline at end of file
@@ -1,18 +1,65 @@
-from typing import Dict, Any
-
-# Two separate caches:
-_VIZ_CACHE_MANUAL: Dict[str, Dict[str, Any]] = {}
-_VIZ_CACHE_AI: Dict[str, Dict[str, Any]] = {}
-
-def get_cached_visualizations(session_id: str, mode: str):
-    if mode == "manual":
-        return _VIZ_CACHE_MANUAL.get(session_id)
-    elif mode == "ai":
-        return _VIZ_CACHE_AI.get(session_id)
-
-def store_visualizations(session_id: str, data: Dict[str, Any], mode: str):
-    if mode == "manual":
-        _VIZ_CACHE_MANUAL[session_id] = data
-    elif mode == "ai":
-        _VIZ_CACHE_AI[session_id] = data
-
+import itertools
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# LRU size cap: caches are keyed per upload (session id / file hash), so
+# without a bound they grow for the lifetime of the server process.
+_MAX_ENTRIES = 128
+
+# Two separate caches, ordered oldest-first for LRU eviction:
+_VIZ_CACHE_MANUAL: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_VIZ_CACHE_AI: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+# Rendered chart images as raw bytes, served by GET /data/chart/{chart_id}.
+# Keeping bytes here (instead of base64 inside the JSON payload) skips the
+# encode/escape/decode roundtrip entirely. LRU-bounded on its own because
+# single-sheet charts are never referenced by a viz-cache entry and would
+# otherwise accumulate for the life of the process.
+_MAX_CHARTS = 4096
+_CHART_STORE: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+_chart_counter = itertools.count()
+
+def store_chart_image(session_id: str, image: bytes, fmt: str) -> str:
+    chart_id = f"{session_id}-{next(_chart_counter)}"
+    _CHART_STORE[chart_id] = (image, fmt)
+    while len(_CHART_STORE) > _MAX_CHARTS:
+        _CHART_STORE.popitem(last=False)
+    return chart_id
+
+def get_chart_image(chart_id: str) -> Optional[Tuple[bytes, str]]:
+    stored = _CHART_STORE.get(chart_id)
+    if stored is not None:
+        _CHART_STORE.move_to_end(chart_id)
+    return stored
+
+def _cache_for(mode: str) -> "Optional[OrderedDict[str, Dict[str, Any]]]":
+    if mode == "manual":
+        return _VIZ_CACHE_MANUAL
+    elif mode == "ai":
+        return _VIZ_CACHE_AI
+    return None
+
+def get_cached_visualizations(session_id: str, mode: str):
+    cache = _cache_for(mode)
+    if cache is None:
+        return None
+    value = cache.get(session_id)
+    if value is not None:
+        cache.move_to_end(session_id)
+    return value
+
+def store_visualizations(session_id: str, data: Dict[str, Any], mode: str):
+    cache = _cache_for(mode)
+    if cache is None:
+        return
+    cache[session_id] = data
+    cache.move_to_end(session_id)
+    while len(cache) > _MAX_ENTRIES:
+        evicted_key, evicted = cache.popitem(last=False)
+        # Drop the chart bytes referenced by the evicted entry too, or the
+        # image store would keep them alive forever
+        for viz_list in evicted.values():
+            for viz in viz_list:
+                image_id = getattr(viz, "image_id", None)
+                if image_id is not None:
+                    _CHART_STORE.pop(image_id, None)
@@ -1,425 +1,531 @@
-from typing import List, Optional, Dict, Any, Tuple
-import io
-import base64
-import warnings
-
-import numpy as np
-import pandas as pd
-import matplotlib
-
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-from groq import Groq
-from config import GROQ_API_KEY, GROQ_MODEL
-from concurrent.futures import ProcessPoolExecutor
-
-from services.viz_cache import get_cached_visualizations, store_visualizations
-from services.excel_reader_service import _EXCEL_CACHE, get_sheet_df
-from models.common_models import VizConfig
-
-warnings.filterwarnings("ignore", category=UserWarning)
-
-# Groq client (optional: if key not set, we fall back to rule-based)
-client: Optional[Groq] = None
-if GROQ_API_KEY:
-    client = Groq(api_key=GROQ_API_KEY)
-
-
-# Helpers: DF preparation & LLM suggestion generation
-def _prepare_df_for_viz(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Return a copy of df with:
-    - object-like date columns converted to datetime (if mostly parsable)
-    """
-    df = df.copy()
-
-    for col in df.columns:
-        if df[col].dtype == "object":
-            # Try to parse as datetime
-            try:
-                parsed = pd.to_datetime(df[col], errors="coerce", infer_datetime_format=True)
-                non_null = df[col].notna().sum()
-                parsed_non_null = parsed.notna().sum()
-
-                # Heuristic: at least 70% of non-null values parse to valid datetimes
-                if non_null > 0 and parsed_non_null / non_null >= 0.7:
-                    df[col] = parsed
-            except Exception:
-                # Leave as-is if parsing fails badly
-                pass
-
-    return df
-
-
-def ask_llm_for_visualizations(df: pd.DataFrame) -> Optional[List[dict]]:
-    """
-    Ask Groq LLM for visualization suggestions based on schema.
-    Returns a list of JSON-like dicts, or None if anything fails.
-    """
-
-    if client is None:
-        # No API key or client, skip LLM
-        return None
-
-    schema = {col: str(df[col].dtype) for col in df.columns}
-
-    prompt = f"""
-You are a data visualization expert.
-
-Given this dataset schema, suggest maximum 5 POSSIBLE but MOST MEANINGFUL visualizations in STRICT JSON.
-
-Do not suggest charts for ID-like columns or where the number of unique values in the column might be equal to the count of that column.
-
-Each JSON object must have:
-- chart_type: one of ["histogram", "scatter", "bar", "countplot", "line"]
-- x: column name
-- y: column name or null
-- description: short description
-
-Schema:
-{schema}
-
-Return ONLY a JSON list. Do NOT include explanation.
-"""
-
-    # ---------- GROQ CALL ----------
-    try:
-        response = client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-        )
-    except Exception as e:
-        print("Groq API Error:", e)
-        return None
-
-    raw = response.choices[0].message.content
-    print("\n--- RAW LLM RESPONSE ---")
-    print(raw)
-    print("------------------------\n")
-
-    # ---------- JSON PARSING ----------
-    import json
-
-    # First try straightforward load
-    try:
-        return json.loads(raw)
-    except Exception:
-        pass
-
-    # Try to extract only the JSON part: find list [ ... ]
-    start = raw.find("[")
-    end = raw.rfind("]")
-    if start != -1 and end != -1:
-        try:
-            cleaned = raw[start : end + 1]
-            return json.loads(cleaned)
-        except Exception:
-            pass
-
-    # Try single object { ... }
-    start = raw.find("{")
-    end = raw.rfind("}")
-    if start != -1 and end != -1:
-        try:
-            one_obj = json.loads(raw[start : end + 1])
-            return [one_obj]
-        except Exception:
-            pass
-
-    print("Failed to parse LLM JSON completely.")
-    return None
-
-
-def _fallback_suggestions(df: pd.DataFrame) -> List[dict]:
-    suggestions: List[dict] = []
-
-    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-    cat_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
-    date_cols = df.select_dtypes(include=["datetime64[ns]", "datetime64[ns, UTC]"]).columns.tolist()
-
-    # Prefer time-series if possible
-    if date_cols and numeric_cols:
-        suggestions.append(
-            {
-                "chart_type": "line",
-                "x": date_cols[0],
-                "y": numeric_cols[0],
-                "description": f"Trend of '{numeric_cols[0]}' over time by '{date_cols[0]}'.",
-            }
-        )
-    elif numeric_cols:
-        suggestions.append(
-            {
-                "chart_type": "histogram",
-                "x": numeric_cols[0],
-                "y": None,
-                "description": f"Distribution of numeric column '{numeric_cols[0]}'.",
-            }
-        )
-
-    if cat_cols:
-        suggestions.append(
-            {
-                "chart_type": "countplot",
-                "x": cat_cols[0],
-                "y": None,
-                "description": f"Category counts for '{cat_cols[0]}'.",
-            }
-        )
-
-    return suggestions
-
-
-def _clean_and_validate_suggestions(
-    df: pd.DataFrame, raw_suggestions: Optional[List[dict]], max_per_sheet: int = 12
-) -> List[dict]:
-    if not raw_suggestions or not isinstance(raw_suggestions, list):
-        return []
-
-    cols = set(df.columns)
-    seen = set()
-    cleaned: List[dict] = []
-
-    for item in raw_suggestions:
-        if not isinstance(item, dict):
-            continue
-
-        chart_type = str(item.get("chart_type", "")).strip().lower()
-        x = item.get("x")
-        y = item.get("y", None)
-        desc = item.get("description", "")
-
-        if not chart_type or x is None:
-            continue
-        if x not in cols:
-            continue
-        if y is not None and y not in cols:
-            continue
-
-        # scatter/line require y
-        if chart_type in ["scatter", "line"] and y is None:
-            continue
-
-        # Basic valid chart types
-        if chart_type not in ["histogram", "scatter", "bar", "countplot", "line"]:
-            continue
-
-        key = (chart_type, x, y)
-        if key in seen:
-            continue
-        seen.add(key)
-
-        cleaned.append(
-            {
-                "chart_type": chart_type,
-                "x": x,
-                "y": y,
-                "description": desc,
-            }
-        )
-
-        if len(cleaned) >= max_per_sheet:
-            break
-
-    return cleaned
-
-
-def _get_viz_suggestions_for_df(df: pd.DataFrame) -> List[dict]:
-    df_prepared = _prepare_df_for_viz(df)
-
-    raw_suggestions = ask_llm_for_visualizations(df_prepared)
-    if not raw_suggestions:
-        raw_suggestions = _fallback_suggestions(df_prepared)
-
-    cleaned = _clean_and_validate_suggestions(df_prepared, raw_suggestions)
-    if not cleaned:
-        # If LLM gave nonsense and fallback also empty somehow, last resort:
-        cleaned = _fallback_suggestions(df_prepared)
-
-    return cleaned
-
-# Chart rendering
-def generate_chart(df: pd.DataFrame, chart_type: str, x: str, y: Optional[str] = None) -> Optional[str]:
-    if x not in df.columns:
-        print(f"CHART ERROR: x='{x}' not in columns")
-        return None
-    if y is not None and y not in df.columns:
-        print(f"CHART ERROR: y='{y}' not in columns")
-        return None
-
-    print(f"\n=== GENERATE CHART ===")
-    print("Chart type:", chart_type)
-    print("X:", x)
-    print("Y:", y)
-    print("Column dtype:", df[x].dtype)
-    print("======================\n")
-
-    plt.figure(figsize=(8, 5))
-
-    try:
-        # histogram
-        if chart_type == "histogram":
-            print("Plot: histogram")
-            # If x is not numeric, fall back to countplot
-            if not np.issubdtype(df[x].dtype, np.number):
-                print("Non-numeric for histogram; using countplot instead.")
-                sns.countplot(data=df, x=x)
-            else:
-                sns.histplot(df[x].dropna(), kde=True)
-
-        # scatter
-        elif chart_type == "scatter":
-            print("Plot: scatter")
-            sns.scatterplot(data=df, x=x, y=y)
-
-        # bar / countplot-like
-        elif chart_type == "bar":
-            print("Plot: bar")
-            if y:
-                sns.barplot(data=df, x=x, y=y)
-            else:
-                # SPECIAL HANDLING — datetime breaks countplot
-                if np.issubdtype(df[x].dtype, np.datetime64):
-                    print("Converting datetime to string for countplot")
-                    temp = df.copy()
-                    temp[x] = temp[x].dt.strftime("%Y-%m-%d")
-                    sns.countplot(data=temp, x=x)
-                else:
-                    sns.countplot(data=df, x=x)
-
-        elif chart_type == "countplot":
-            print("Plot: countplot")
-            sns.countplot(data=df, x=x)
-
-        # line
-        elif chart_type == "line":
-            print("Plot: line")
-            sns.lineplot(data=df, x=x, y=y)
-
-        else:
-            print("UNKNOWN CHART TYPE")
-            return None
-
-        buffer = io.BytesIO()
-        plt.tight_layout()
-        plt.savefig(buffer, format="png")
-        plt.close()
-        buffer.seek(0)
-
-        data = buffer.read()
-        print("PNG bytes length:", len(data))
-        return base64.b64encode(data).decode("utf-8")
-
-    except Exception as e:
-        print("CHART ERROR:", e)
-        plt.close()
-        return None
-
-
-# -------------------------------------------------------------------
-# Public: Single-sheet visualizations (used by /data/visualizations)
-# -------------------------------------------------------------------
-def suggest_visualizations(session_id: str, sheet_name: str) -> List[VizConfig]:
-    """
-    Generate visualizations (metadata + images) for a SINGLE sheet.
-    This is used by the existing /data/visualizations endpoint.
-    """
-    df_raw = get_sheet_df(session_id, sheet_name)
-    df = _prepare_df_for_viz(df_raw)
-    suggestions = _get_viz_suggestions_for_df(df)
-
-    viz_results: List[VizConfig] = []
-
-    for item in suggestions:
-        chart_type = item.get("chart_type")
-        x = item.get("x")
-        y = item.get("y")
-        desc = item.get("description", "")
-
-        img_base64 = generate_chart(df=df, chart_type=chart_type, x=x, y=y)
-
-        viz_results.append(
-            VizConfig(
-                chart_type=chart_type,
-                x=x,
-                y=y,
-                description=desc,
-                image_base64=img_base64,
-            )
-        )
-
-    return viz_results
-
-
-# Multiprocessing helper for all-sheets visualization
-def _render_chart_process(task: Tuple[str, pd.DataFrame, str, str, Optional[str], str]):
-    sheet_name, df, chart_type, x, y, desc = task
-    img = generate_chart(df, chart_type, x, y)
-    return sheet_name, chart_type, x, y, desc, img
-
-
-# Public: ALL-sheets visualizations (used by /data/visualizations/all)
-def suggest_visualizations_for_all_sheets(
-    session_id: str, user_filters: Optional[Dict[str, List[str]]] = None
-) -> Dict[str, List[VizConfig]]:
-    # 1. Check cache
-    cached = get_cached_visualizations(session_id, mode="ai")
-    if cached:
-        return cached
-
-    sheet_dfs = _EXCEL_CACHE.get(session_id)
-    if not sheet_dfs:
-        raise KeyError("Sheets not loaded.")
-
-    tasks: List[Tuple[str, pd.DataFrame, str, str, Optional[str], str]] = []
-
-    # 2. Build tasks for all sheets
-    for sheet_name, df_raw in sheet_dfs.items():
-        df = _prepare_df_for_viz(df_raw)
-        suggestions = _get_viz_suggestions_for_df(df)
-
-        # If user provided allowed chart types per sheet, filter here
-        if user_filters and sheet_name in user_filters:
-            allowed_types = set(user_filters[sheet_name])
-            suggestions = [s for s in suggestions if s.get("chart_type") in allowed_types]
-
-        for s in suggestions:
-            chart_type = s.get("chart_type")
-            x = s.get("x")
-            y = s.get("y")
-            desc = s.get("description", "")
-
-            tasks.append((sheet_name, df, chart_type, x, y, desc))
-
-    # If no tasks at all, return empty
-    if not tasks:
-        store_visualizations(session_id, {})
-        return {}
-
-    # 3. Run chart rendering in parallel
-    final_result: Dict[str, List[VizConfig]] = {}
-
-    with ProcessPoolExecutor() as executor:
-        results = list(executor.map(_render_chart_process, tasks))
-
-    # 4. Collect results into VizConfig objects
-    for sheet_name, chart_type, x, y, desc, img in results:
-        if sheet_name not in final_result:
-            final_result[sheet_name] = []
-
-        final_result[sheet_name].append(
-            VizConfig(
-                chart_type=chart_type,
-                x=x,
-                y=y,
-                description=desc,
-                image_base64=img,
-            )
-        )
-
-    # 5. Cache & return
-    store_visualizations(session_id, final_result, mode="ai")
-    return final_result
+from typing import List, Optional, Dict, Any, Tuple
+import functools
+import io
+import logging
+import os
+import re
+import warnings
+
+import numpy as np
+import orjson
+import pandas as pd
+import psutil
+
+from config import GROQ_API_KEY, GROQ_MODEL
+from concurrent.futures import ThreadPoolExecutor
+
+from services.viz_cache import get_cached_visualizations, store_chart_image, store_visualizations
+from services.excel_reader_service import get_prepared_df, get_sheet_names
+from models.common_models import VizConfig
+
+warnings.filterwarnings("ignore", category=UserWarning)
+
+logger = logging.getLogger(__name__)
+
+# Compiled once: one regex scan over the LLM response replaces the paired
+# find/rfind passes previously used to locate the JSON payload
+_JSON_LIST_RE = re.compile(r"\[.*\]", re.S)
+_JSON_OBJ_RE = re.compile(r"\{.*\}", re.S)
+
+# Groq client (optional: if key not set, we fall back to rule-based).
+# Built lazily so importing this module doesn't construct an HTTP client,
+# and cached so repeated calls share one connection pool.
+@functools.lru_cache(maxsize=1)
+def _get_groq_client():
+    if not GROQ_API_KEY:
+        return None
+    from groq import Groq
+    return Groq(api_key=GROQ_API_KEY)
+
+
+# Helpers: DF preparation & LLM suggestion generation
+def _prepare_df_for_viz(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return a copy of df with:
+    - object-like date columns converted to datetime (if mostly parsable)
+    """
+    df = df.copy()
+
+    for col in df.columns:
+        if df[col].dtype == "object":
+            # Probe a small sample first: full-column datetime parsing is
+            # O(N) and most object columns are not dates at all
+            try:
+                sample = df[col].dropna().head(200)
+                if sample.empty:
+                    continue
+                parsed_sample = pd.to_datetime(sample, errors="coerce", format="mixed")
+
+                # Heuristic: at least 70% of sampled values parse to valid datetimes
+                if parsed_sample.notna().mean() >= 0.7:
+                    parsed = pd.to_datetime(df[col], errors="coerce", format="mixed")
+                    non_null = df[col].notna().sum()
+                    if non_null > 0 and parsed.notna().sum() / non_null >= 0.7:
+                        df[col] = parsed
+            except Exception:
+                # Leave as-is if parsing fails badly
+                pass
+
+    return df
+
+
+def ask_llm_for_visualizations(df: pd.DataFrame) -> Optional[List[dict]]:
+    """
+    Ask Groq LLM for visualization suggestions based on schema.
+    Returns a list of JSON-like dicts, or None if anything fails.
+
+    The prompt depends only on column names and dtypes, so the actual call
+    is memoized on that schema fingerprint — identical schemas (re-uploads,
+    sheets with the same layout) skip the network round trip.
+    """
+
+    if _get_groq_client() is None:
+        # No API key or client, skip LLM
+        return None
+
+    # dtypes.astype(str) walks the BlockManager in C; the per-column
+    # df[col].dtype comprehension paid a getitem per column
+    schema_items = tuple(sorted(df.dtypes.astype(str).items()))
+
+    # lru_cache never stores a call that raised, so transient Groq errors
+    # or an unparseable reply fall back for this request only instead of
+    # pinning the schema to the rule-based path for the process lifetime
+    try:
+        return _ask_llm_cached(schema_items)
+    except Exception:
+        return None
+
+
+# Built once at import: only the schema varies between calls
+_PROMPT_TEMPLATE = """
+You are a data visualization expert.
+
+Given this dataset schema, suggest maximum 5 POSSIBLE but MOST MEANINGFUL visualizations in STRICT JSON.
+
+Do not suggest charts for ID-like columns or where the number of unique values in the column might be equal to the count of that column.
+
+Each JSON object must have:
+- chart_type: one of ["histogram", "scatter", "bar", "countplot", "line"]
+- x: column name
+- y: column name or null
+- description: short description
+
+Schema:
+{schema}
+
+Return ONLY a JSON list. Do NOT include explanation.
+"""
+
+
+@functools.lru_cache(maxsize=256)
+def _ask_llm_cached(schema_items: Tuple[Tuple[str, str], ...]) -> Optional[List[dict]]:
+    prompt = _PROMPT_TEMPLATE.format(schema=dict(schema_items))
+
+    # ---------- GROQ CALL ----------
+    try:
+        response = _get_groq_client().chat.completions.create(
+            model=GROQ_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+        )
+    except Exception:
+        logger.exception("Groq API error")
+        raise
+
+    raw = response.choices[0].message.content
+    logger.debug("Raw LLM response: %s", raw)
+
+    # ---------- JSON PARSING ----------
+    # First try straightforward load
+    try:
+        return orjson.loads(raw)
+    except Exception:
+        pass
+
+    # Try to extract only the JSON part: greedy list [ ... ]
+    m = _JSON_LIST_RE.search(raw)
+    if m:
+        try:
+            return orjson.loads(m.group(0))
+        except Exception:
+            pass
+
+    # Try single object { ... }
+    m = _JSON_OBJ_RE.search(raw)
+    if m:
+        try:
+            return [orjson.loads(m.group(0))]
+        except Exception:
+            pass
+
+    logger.warning("Failed to parse LLM JSON completely.")
+    raise ValueError("Unparseable LLM response")
+
+
+def _fallback_suggestions(df: pd.DataFrame) -> List[dict]:
+    suggestions: List[dict] = []
+
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    cat_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
+    date_cols = df.select_dtypes(include=["datetime64[ns]", "datetime64[ns, UTC]"]).columns.tolist()
+
+    # Prefer time-series if possible
+    if date_cols and numeric_cols:
+        suggestions.append(
+            {
+                "chart_type": "line",
+                "x": date_cols[0],
+                "y": numeric_cols[0],
+                "description": f"Trend of '{numeric_cols[0]}' over time by '{date_cols[0]}'.",
+            }
+        )
+    elif numeric_cols:
+        suggestions.append(
+            {
+                "chart_type": "histogram",
+                "x": numeric_cols[0],
+                "y": None,
+                "description": f"Distribution of numeric column '{numeric_cols[0]}'.",
+            }
+        )
+
+    if cat_cols:
+        suggestions.append(
+            {
+                "chart_type": "countplot",
+                "x": cat_cols[0],
+                "y": None,
+                "description": f"Category counts for '{cat_cols[0]}'.",
+            }
+        )
+
+    return suggestions
+
+
+def _clean_and_validate_suggestions(
+    df: pd.DataFrame, raw_suggestions: Optional[List[dict]], max_per_sheet: int = 12
+) -> List[dict]:
+    if not raw_suggestions or not isinstance(raw_suggestions, list):
+        return []
+
+    cols = set(df.columns)
+    seen = set()
+    cleaned: List[dict] = []
+
+    for item in raw_suggestions:
+        if not isinstance(item, dict):
+            continue
+
+        chart_type = str(item.get("chart_type", "")).strip().lower()
+        x = item.get("x")
+        y = item.get("y", None)
+        desc = item.get("description", "")
+
+        if not chart_type or x is None:
+            continue
+        if x not in cols:
+            continue
+        if y is not None and y not in cols:
+            continue
+
+        # scatter/line require y
+        if chart_type in ["scatter", "line"] and y is None:
+            continue
+
+        # Basic valid chart types
+        if chart_type not in ["histogram", "scatter", "bar", "countplot", "line"]:
+            continue
+
+        key = (chart_type, x, y)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        cleaned.append(
+            {
+                "chart_type": chart_type,
+                "x": x,
+                "y": y,
+                "description": desc,
+            }
+        )
+
+        if len(cleaned) >= max_per_sheet:
+            break
+
+    return cleaned
+
+
+def _get_viz_suggestions_for_df(df: pd.DataFrame) -> List[dict]:
+    # df is expected to be already prepared (see get_prepared_df callers)
+    raw_suggestions = ask_llm_for_visualizations(df)
+    if not raw_suggestions:
+        raw_suggestions = _fallback_suggestions(df)
+
+    cleaned = _clean_and_validate_suggestions(df, raw_suggestions)
+    if not cleaned:
+        # If LLM gave nonsense and fallback also empty somehow, last resort:
+        cleaned = _fallback_suggestions(df)
+
+    return cleaned
+
+# Chart rendering
+def _counts_bar(ax, series: pd.Series, xlabel: str) -> None:
+    # Aggregate first: countplot re-groups the raw column inside seaborn,
+    # while value_counts + bar hands matplotlib at most 50 values
+    vc = series.value_counts().head(50)
+    ax.bar(vc.index.astype(str), vc.values)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel("count")
+
+
+def _histogram(ax, series: pd.Series) -> None:
+    import seaborn as sns
+
+    arr = series.dropna().to_numpy()
+    if arr.size <= 100_000:
+        sns.histplot(arr, kde=True, ax=ax)
+    else:
+        # Bin with numpy and draw 30 steps instead of shipping every raw
+        # value through seaborn; KDE is skipped at this size
+        counts, edges = np.histogram(arr, bins=30)
+        ax.stairs(counts, edges, fill=True)
+        ax.set_ylabel("count")
+
+
+def generate_chart(df: pd.DataFrame, chart_type: str, x: str, y: Optional[str] = None) -> Optional[bytes]:
+    """
+    Generate a single chart and return the raw PNG bytes. Callers store
+    the bytes in the chart store and reference them by image_id; base64
+    would inflate every image by a third just to pass through JSON.
+    """
+    if x not in df.columns:
+        logger.error("Chart error: x=%r not in columns", x)
+        return None
+    if y is not None and y not in df.columns:
+        logger.error("Chart error: y=%r not in columns", y)
+        return None
+
+    # debug-gated: unconditional prints are measurable in the render loop
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Generate chart: type=%s x=%s y=%s dtype=%s",
+            chart_type, x, y, df[x].dtype,
+        )
+
+    # Deferred render imports: stats/preview callers import this module
+    # without ever drawing, and matplotlib+seaborn are the slow part of a
+    # cold start. After the first chart these are sys.modules lookups.
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import seaborn as sns
+
+    # Streamlit shows these at 300px wide; 4.5x3 in @ 90 dpi (405x270)
+    # renders ~3x fewer pixels than the old 800x500 with no visible loss.
+    # Object-oriented API on purpose: pyplot's Gcf registry is process-global
+    # state, so plt.figure() from concurrent render threads would collide.
+    fig = Figure(figsize=(4.5, 3), dpi=90)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+
+    try:
+        # histogram
+        if chart_type == "histogram":
+            # If x is not numeric, fall back to countplot
+            if not np.issubdtype(df[x].dtype, np.number):
+                logger.debug("Non-numeric for histogram; using countplot instead.")
+                _counts_bar(ax, df[x], x)
+            else:
+                _histogram(ax, df[x])
+                ax.set_xlabel(x)
+
+        # scatter
+        elif chart_type == "scatter":
+            # 10k points already oversaturate a 405x270 canvas; drawing
+            # more only costs Agg time
+            d = df.sample(10_000, random_state=0) if len(df) > 10_000 else df
+            sns.scatterplot(data=d, x=x, y=y, ax=ax)
+
+        # bar / countplot-like
+        elif chart_type == "bar":
+            if y:
+                sns.barplot(data=df, x=x, y=y, ax=ax)
+            else:
+                # SPECIAL HANDLING — datetime breaks countplot; format just
+                # the one column and keep the days in order
+                if np.issubdtype(df[x].dtype, np.datetime64):
+                    counts = df[x].dt.strftime("%Y-%m-%d").value_counts().sort_index()
+                    ax.bar(counts.index, counts.values)
+                    ax.set_xlabel(x)
+                    ax.set_ylabel("count")
+                else:
+                    _counts_bar(ax, df[x], x)
+
+        elif chart_type == "countplot":
+            _counts_bar(ax, df[x], x)
+
+        # line
+        elif chart_type == "line":
+            # Uniform stride keeps the x-order intact, unlike sampling
+            step = max(1, len(df) // 10_000)
+            d = df.iloc[::step] if step > 1 else df
+            sns.lineplot(data=d, x=x, y=y, ax=ax)
+
+        else:
+            logger.warning("Unknown chart type: %s", chart_type)
+            return None
+
+        fig.tight_layout()
+        # lowest zlib level: ~10% larger PNG for ~3x faster encode
+        with io.BytesIO() as buffer:
+            fig.savefig(buffer, format="png", pil_kwargs={"compress_level": 1})
+            data = buffer.getvalue()
+
+        logger.debug("PNG bytes length: %d", len(data))
+        return data
+
+    except Exception:
+        logger.exception("Chart error (type=%s x=%s y=%s)", chart_type, x, y)
+        return None
+
+    finally:
+        # Drop the artists now rather than when GC gets around to the
+        # figure; with many tasks in flight the canvases add up
+        fig.clf()
+
+
+# -------------------------------------------------------------------
+# Public: Single-sheet visualizations (used by /data/visualizations)
+# -------------------------------------------------------------------
+def suggest_visualizations(session_id: str, sheet_name: str) -> List[VizConfig]:
+    """
+    Generate visualizations (metadata + images) for a SINGLE sheet.
+    This is used by the existing /data/visualizations endpoint.
+    """
+    df = get_prepared_df(session_id, sheet_name, _prepare_df_for_viz)
+    suggestions = _get_viz_suggestions_for_df(df)
+
+    viz_results: List[VizConfig] = []
+
+    for item in suggestions:
+        chart_type = item.get("chart_type")
+        x = item.get("x")
+        y = item.get("y")
+        desc = item.get("description", "")
+
+        img = generate_chart(df=df, chart_type=chart_type, x=x, y=y)
+        image_id = store_chart_image(session_id, img, "png") if img else None
+
+        viz_results.append(
+            VizConfig(
+                chart_type=chart_type,
+                x=x,
+                y=y,
+                description=desc,
+                image_id=image_id,
+            )
+        )
+
+    return viz_results
+
+
+# Render helper for all-sheets visualization. Runs on threads: Agg's
+# rasterizer and libpng release the GIL, and generate_chart builds a
+# private Figure per call, so threads parallelize the C work without
+# pickling dataframes to worker processes.
+def _render_chart_task(task: Tuple[str, pd.DataFrame, str, str, Optional[str], str]):
+    sheet_name, df, chart_type, x, y, desc = task
+    img = generate_chart(df, chart_type, x, y)
+    return sheet_name, chart_type, x, y, desc, img
+
+
+def _render_workers(n_tasks: int) -> int:
+    # Every in-flight render holds a figure, its canvas and the PNG buffer
+    # (~50MB budgeted); cap concurrency by available memory as well as
+    # cores so a many-sheet workbook can't exhaust RAM
+    mem_cap = int(psutil.virtual_memory().available // (50 * 1024 * 1024))
+    return max(1, min(8, os.cpu_count() or 1, mem_cap, n_tasks))
+
+
+# Public: ALL-sheets visualizations (used by /data/visualizations/all)
+def suggest_visualizations_for_all_sheets(
+    session_id: str,
+    user_filters: Optional[Dict[str, List[str]]] = None,
+    cache_key: Optional[str] = None,
+) -> Dict[str, List[VizConfig]]:
+    # 1. Check cache — keyed by file-content hash when available, so the
+    #    same file re-uploaded under a new session_id still hits
+    cache_key = cache_key or session_id
+    cached = get_cached_visualizations(cache_key, mode="ai")
+    if cached:
+        return cached
+
+    sheet_names = get_sheet_names(session_id)
+    if not sheet_names:
+        raise KeyError("Sheets not loaded.")
+
+    tasks: List[Tuple[str, pd.DataFrame, str, str, Optional[str], str]] = []
+
+    # Sheets with identical schemas (same columns and dtypes) get identical
+    # suggestions, so run the LLM/fallback pipeline once per distinct schema
+    suggestions_by_schema: Dict[Tuple[Tuple[str, str], ...], List[dict]] = {}
+
+    # 2. Build tasks for all sheets
+    for sheet_name in sheet_names:
+        df = get_prepared_df(session_id, sheet_name, _prepare_df_for_viz)
+        schema_key = tuple(sorted(df.dtypes.astype(str).items()))
+        suggestions = suggestions_by_schema.get(schema_key)
+        if suggestions is None:
+            suggestions = _get_viz_suggestions_for_df(df)
+            suggestions_by_schema[schema_key] = suggestions
+
+        # If user provided allowed chart types per sheet, filter here
+        if user_filters and sheet_name in user_filters:
+            allowed_types = set(user_filters[sheet_name])
+            suggestions = [s for s in suggestions if s.get("chart_type") in allowed_types]
+
+        for s in suggestions:
+            chart_type = s.get("chart_type")
+            x = s.get("x")
+            y = s.get("y")
+            desc = s.get("description", "")
+
+            # Each chart only touches x (and maybe y): hand the renderer
+            # just those columns so seaborn never walks the full sheet
+            task_df = df[[c for c in (x, y) if c is not None]]
+            tasks.append((sheet_name, task_df, chart_type, x, y, desc))
+
+    # If no tasks at all, return empty
+    if not tasks:
+        store_visualizations(cache_key, {}, mode="ai")
+        return {}
+
+    # 3. Run chart rendering in parallel
+    final_result: Dict[str, List[VizConfig]] = {}
+
+    with ThreadPoolExecutor(max_workers=_render_workers(len(tasks))) as executor:
+        results = list(executor.map(_render_chart_task, tasks))
+
+    # 4. Collect results into VizConfig objects; images go into the chart
+    #    store and travel as ids, served raw by GET /data/chart/{id}
+    for sheet_name, chart_type, x, y, desc, img in results:
+        if sheet_name not in final_result:
+            final_result[sheet_name] = []
+
+        image_id = store_chart_image(session_id, img, "png") if img else None
+        final_result[sheet_name].append(
+            VizConfig(
+                chart_type=chart_type,
+                x=x,
+                y=y,
+                description=desc,
+                image_id=image_id,
+            )
+        )
+
+    # 5. Cache & return
+    store_visualizations(cache_key, final_result, mode="ai")
+    return final_result